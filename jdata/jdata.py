@@ -13,6 +13,7 @@ __all__ = ["encode", "decode", "jdtype", "jsonfilter"]
 
 import numpy as np
 import copy
+import math
 import zlib
 import base64
 import os
@@ -62,6 +63,18 @@ _zipper = (
 
 _allownumpy = ("_ArraySize_", "_ArrayData_", "_ArrayZipSize_", "_ArrayZipData_")
 
+_re_linkroot = re.compile(r"\:\$")
+_re_linkrootpath = re.compile(
+    r"^(?P<proto>[a-zA-Z]+://)*(?P<path>.+)(?P<delim>\:)()*(?P<jsonpath>(?<=:)\$\d*\.*.*)*"
+)
+_re_linkpath = re.compile(
+    r"^(?P<proto>[a-zA-Z]+://)*(?P<path>.+)(?P<delim>\:)*(?P<jsonpath>(?<=:)\$\d*\..*)*"
+)
+
+# exact types of JSON leaf values that encode() or decode() return unchanged
+_encodeasis = frozenset((int, bool, str, type(None)))
+_decodeasis = frozenset((int, bool, float, type(None)))
+
 ##====================================================================================
 ## Python to JData encoding function
 ##====================================================================================
@@ -83,6 +96,9 @@ def encode(d, opt={}):
 
     opt.setdefault("inplace", False)
 
+    if type(d) in _encodeasis:
+        return d
+
     if "compression" in opt:
         if opt["compression"] == "lzma":
             try:
@@ -113,9 +129,9 @@ def encode(d, opt={}):
                 )
 
     if isinstance(d, float):
-        if np.isnan(d):
+        if math.isnan(d):
             return "_NaN_"
-        elif np.isinf(d):
+        elif math.isinf(d):
             return "_Inf_" if (d > 0) else "-_Inf_"
         return d
     elif isinstance(d, list) or isinstance(d, set):
@@ -195,23 +211,18 @@ def encode(d, opt={}):
                         "blosc2zlib": blosc2.Codec.ZLIB,
                         "blosc2zstd": blosc2.Codec.ZSTD,
                     }
-                    blosc2nthread = 1
-                    if "nthread" in opt:
-                        blosc2nthread = opt["nthread"]
                     newobj["_ArrayZipData_"] = blosc2.compress2(
                         newobj["_ArrayZipData_"],
                         codec=BLOSC2CODEC[opt["compression"]],
                         typesize=d.dtype.itemsize,
-                        nthreads=blosc2nthread,
+                        nthreads=opt.get("nthread", 1),
                     )
                 except ImportError:
                     print(
                         'you must install "blosc2" module to compress with this format, ignoring'
                     )
                     pass
-            if (("base64" in opt) and (opt["base64"])) or opt[
-                "compression"
-            ] == "base64":
+            if opt.get("base64") or opt["compression"] == "base64":
                 newobj["_ArrayZipData_"] = base64.b64encode(newobj["_ArrayZipData_"])
             newobj.pop("_ArrayData_")
         return newobj
@@ -238,7 +249,9 @@ def decode(d, opt={}):
     opt.setdefault("inplace", False)
     opt.setdefault("maxlinklevel", 0)
 
-    if (
+    if type(d) in _decodeasis:
+        return d
+    elif (
         (isinstance(d, str) or type(d) == "unicode")
         and len(d) <= 6
         and len(d) > 4
@@ -259,24 +272,29 @@ def decode(d, opt={}):
         if "_ArrayType_" in d:
             if isinstance(d["_ArraySize_"], str):
                 d["_ArraySize_"] = np.frombuffer(bytearray(d["_ArraySize_"]))
+            arraysize = d["_ArraySize_"]
+            arrayorder = (
+                "F"
+                if d.get("_ArrayOrder_", "").lower() in ("c", "col", "column")
+                else "C"
+            )
             if "_ArrayZipData_" in d:
                 newobj = d["_ArrayZipData_"]
-                if (("base64" in opt) and (opt["base64"])) or (
-                    "_ArrayZipType_" in d and d["_ArrayZipType_"] == "base64"
-                ):
+                ziptype = d.get("_ArrayZipType_")
+                if opt.get("base64") or ziptype == "base64":
                     newobj = base64.b64decode(newobj)
-                if "_ArrayZipType_" in d and d["_ArrayZipType_"] not in _zipper:
+                if ziptype is not None and ziptype not in _zipper:
                     raise Exception(
                         "JData",
-                        "compression method {} is not supported".format(
-                            d["_ArrayZipType_"]
-                        ),
+                        "compression method {} is not supported".format(ziptype),
                     )
-                if d["_ArrayZipType_"] == "zlib":
-                    newobj = zlib.decompress(bytes(newobj))
-                elif d["_ArrayZipType_"] == "gzip":
-                    newobj = zlib.decompress(bytes(newobj), zlib.MAX_WBITS | 32)
-                elif d["_ArrayZipType_"] == "lzma":
+                if not isinstance(newobj, (bytes, bytearray, memoryview, np.ndarray)):
+                    newobj = bytes(newobj)
+                if ziptype == "zlib":
+                    newobj = zlib.decompress(newobj)
+                elif ziptype == "gzip":
+                    newobj = zlib.decompress(newobj, zlib.MAX_WBITS | 32)
+                elif ziptype == "lzma":
                     try:
                         import lzma
                     except ImportError:
@@ -284,7 +302,7 @@ def decode(d, opt={}):
                     buf = bytearray(newobj)  # set length to -1 (unknown) if EOF appears
                     buf[5:13] = b"\xff\xff\xff\xff\xff\xff\xff\xff"
                     newobj = lzma.decompress(buf, lzma.FORMAT_ALONE)
-                elif d["_ArrayZipType_"] == "lz4":
+                elif ziptype == "lz4":
                     try:
                         import lz4.frame
 
@@ -294,41 +312,34 @@ def decode(d, opt={}):
                             'Warning: you must install "lz4" module to decompress a data record in this file, ignoring'
                         )
                         return copy.deepcopy(d) if opt["inplace"] else d
-                elif d["_ArrayZipType_"].startswith("blosc2"):
+                elif ziptype.startswith("blosc2"):
                     try:
                         import blosc2
 
-                        blosc2nthread = 1
-                        if "nthread" in opt:
-                            blosc2nthread = opt["nthread"]
                         newobj = blosc2.decompress2(
-                            bytes(newobj), as_bytearray=False, nthreads=blosc2nthread
+                            newobj, nthreads=opt.get("nthread", 1)
                         )
                     except Exception:
                         print(
                             'Warning: you must install "blosc2" module to decompress a data record in this file, ignoring'
                         )
                         return copy.deepcopy(d) if opt["inplace"] else d
+                newobj = bytearray(newobj)  # writable buffer for the output array
                 newobj = np.frombuffer(
-                    bytearray(newobj), dtype=np.dtype(d["_ArrayType_"])
+                    newobj, dtype=np.dtype(d["_ArrayType_"])
                 ).reshape(d["_ArrayZipSize_"])
                 if "_ArrayIsComplex_" in d and newobj.shape[0] == 2:
                     newobj = newobj[0] + 1j * newobj[1]
-                if "_ArrayOrder_" in d and (
-                    d["_ArrayOrder_"].lower() == "c"
-                    or d["_ArrayOrder_"].lower() == "col"
-                    or d["_ArrayOrder_"].lower() == "column"
-                ):
-                    newobj = newobj.reshape(d["_ArraySize_"], order="F")
-                else:
-                    newobj = newobj.reshape(d["_ArraySize_"])
-                if not hasattr(d["_ArraySize_"], "__iter__") and d["_ArraySize_"] == 1:
+                newobj = newobj.reshape(arraysize, order=arrayorder)
+                if not hasattr(arraysize, "__iter__") and arraysize == 1:
                     newobj = newobj.item()
                 return newobj
             elif "_ArrayData_" in d:
                 if isinstance(d["_ArrayData_"], str):
+                    # one char per byte; bytearray keeps the output array writable
                     newobj = np.frombuffer(
-                        d["_ArrayData_"], dtype=np.dtype(d["_ArrayType_"])
+                        bytearray(d["_ArrayData_"], "latin-1"),
+                        dtype=np.dtype(d["_ArrayType_"]),
                     )
                 else:
                     newobj = np.asarray(
@@ -342,15 +353,8 @@ def decode(d, opt={}):
                     newobj = newobj.reshape(d["_ArrayZipSize_"])
                 if "_ArrayIsComplex_" in d and newobj.shape[0] == 2:
                     newobj = newobj[0] + 1j * newobj[1]
-                if "_ArrayOrder_" in d and (
-                    d["_ArrayOrder_"].lower() == "c"
-                    or d["_ArrayOrder_"].lower() == "col"
-                    or d["_ArrayOrder_"].lower() == "column"
-                ):
-                    newobj = newobj.reshape(d["_ArraySize_"], order="F")
-                else:
-                    newobj = newobj.reshape(d["_ArraySize_"])
-                if not hasattr(d["_ArraySize_"], "__iter__") and d["_ArraySize_"] == 1:
+                newobj = newobj.reshape(arraysize, order=arrayorder)
+                if not hasattr(arraysize, "__iter__") and arraysize == 1:
                     newobj = newobj.item()
                 return newobj
             else:
@@ -362,16 +366,10 @@ def decode(d, opt={}):
             if opt["maxlinklevel"] > 0 and "_DataLink_" in data:
                 if isinstance(data["_DataLink_"], str):
                     datalink = data["_DataLink_"]
-                    if re.search("\:\$", datalink):
-                        ref = re.search(
-                            "^(?P<proto>[a-zA-Z]+://)*(?P<path>.+)(?P<delim>\:)()*(?P<jsonpath>(?<=:)\$\d*\.*.*)*",
-                            datalink,
-                        )
+                    if _re_linkroot.search(datalink):
+                        ref = _re_linkrootpath.search(datalink)
                     else:
-                        ref = re.search(
-                            "^(?P<proto>[a-zA-Z]+://)*(?P<path>.+)(?P<delim>\:)*(?P<jsonpath>(?<=:)\$\d*\..*)*",
-                            datalink,
-                        )
+                        ref = _re_linkpath.search(datalink)
                     if ref and ref.group("path"):
                         uripath = ref.group("proto") + ref.group("path")
                         newobj, fname = jdlink(uripath)
@@ -406,9 +404,9 @@ def jsonfilter(obj):
     elif isinstance(obj, (bytes, bytearray)):
         return obj.decode("utf-8")
     elif isinstance(obj, float):
-        if np.isnan(obj):
+        if math.isnan(obj):
             return "_NaN_"
-        elif np.isinf(obj):
+        elif math.isinf(obj):
             return "_Inf_" if (obj > 0) else "-_Inf_"
 
 
@@ -27,12 +27,18 @@ __all__ = [
 
 import json
 import os
+import copy
+import zlib
+import uuid
 import re
 import jdata as jd
 import urllib.request
+import urllib.error
+import urllib.parse
 from hashlib import sha256
 from sys import platform
 from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 
 ##====================================================================================
 ## global variables
@@ -43,6 +49,22 @@ jext = {
     "b": [".ubj", ".bjd", ".jdb", ".jbat", ".bnii", ".bmsh", ".pmat", ".bnirs"],
 }
 
+_httppools = {}
+_httproutes = {}
+_httpheaders = {"Accept-Encoding": "gzip, deflate"}
+_httpchunk = 1 << 20
+
+_re_neurojsonorg = re.compile(r"^https*://neurojson.org/io/")
+_re_domain = re.compile(r"^(https*|ftp)://([^\/?#:]+).*$")
+_re_dbname = re.compile(r"(?<=db=)[^&]+")
+_re_docname = re.compile(r"(?<=doc=)[^&]+")
+_re_filename = re.compile(r"(?<=file=)[^&]+")
+_re_neurojsonio = re.compile(
+    r"^(https*|ftp)://neurojson.io(:\d+)*(?P<dbname>/[^\/]+)(?P<docname>/[^\/]+)(?P<filename>/[^\/?]+)*"
+)
+_re_suffix = re.compile(r"\.\w{1,5}(?=([#&].*)*$)")
+_re_filesize = re.compile(r"&size=(\d+)")
+
 ##====================================================================================
 ## Loading and saving data based on file extensions
 ##====================================================================================
@@ -54,7 +76,7 @@ def load(fname, opt={}, **kwargs):
     @param[in] fname: a JData file name (accept .json,.jdat,.jbat,.jnii,.bnii,.jmsh,.bmsh)
     @param[in] opt: options, if opt['decode']=True or 1 (default), call jdata.decode() after loading
     """
-    if re.match("^https*://", fname):
+    if fname.startswith(("http://", "https://")):
         newdata = downloadlink(fname, opt, **kwargs)
         return newdata[0]
 
@@ -112,7 +134,7 @@ def loadurl(url, opt={}, **kwargs):
     """
     opt.setdefault("nocache", True)
 
-    if re.match("^https*://", url):
+    if url.startswith(("http://", "https://")):
         newdata = downloadlink(url, opt, **kwargs)
         return newdata[0]
     else:
@@ -341,24 +363,24 @@ def jsoncache(url, opt={}, **kwargs):
 
     if isinstance(url, str):
         link = url
-        if re.match("^file://", link) or not re.search("://", link):
-            filename = re.sub("^file://", "", link)
+        if link.startswith("file://") or "://" not in link:
+            filename = link[7:] if link.startswith("file://") else link
             if os.path.isfile(filename):
                 cachepath = filename
                 filename = True
                 return cachepath, filename
 
         else:
-            if re.match("^https*://neurojson.org/io/", link):
+            if _re_neurojsonorg.match(link):
                 domain = "io"
             else:
-                newdomain = re.sub("^(https*|ftp)://([^\/?#:]+).*$", r"\2", link)
+                newdomain = _re_domain.sub(r"\2", link)
                 if newdomain:
                     domain = newdomain
 
-            dbname = re.search("(?<=db=)[^&]+", link)
-            docname = re.search("(?<=doc=)[^&]+", link)
-            filename = re.search("(?<=file=)[^&]+", link)
+            dbname = _re_dbname.search(link)
+            docname = _re_docname.search(link)
+            filename = _re_filename.search(link)
             if dbname:
                 dbname = dbname.group(0)
             if docname:
@@ -367,10 +389,7 @@ def jsoncache(url, opt={}, **kwargs):
                 filename = filename.group(0)
 
             if not filename and domain == "neurojson.io":
-                ref = re.search(
-                    "^(https*|ftp)://neurojson.io(:\d+)*(?P<dbname>/[^\/]+)(?P<docname>/[^\/]+)(?P<filename>/[^\/?]+)*",
-                    link,
-                )
+                ref = _re_neurojsonio.search(link)
                 if ref:
                     if ref.group("dbname"):
                         dbname = ref.group("dbname")[1:]
@@ -386,7 +405,7 @@ def jsoncache(url, opt={}, **kwargs):
 
             if not filename:
                 filename = sha256(link.encode("utf-8")).hexdigest()
-                suffix = re.search("\.\w{1,5}(?=([#&].*)*$)", link)
+                suffix = _re_suffix.search(link)
                 if not suffix:
                     suffix = ""
                 else:
@@ -430,6 +449,7 @@ def jdlink(uripath, opt={}, **kwargs):
 
     @param[in] url: a URL
     @param[in] opt: options, if opt['decode']=True or 1 (default), call jdata.decode() before saving
+         'downloadthread': number of threads to download a list of URLs in parallel, default is 1
     """
 
     opt.setdefault("showlink", 1)
@@ -444,7 +464,7 @@ def jdlink(uripath, opt={}, **kwargs):
             totalsize = 0
             nosize = 0
             for i in range(len(uripath)):
-                filesize = re.findall(r"&size=(\d+)", uripath[i])
+                filesize = _re_filesize.findall(uripath[i])
                 if filesize and filesize[0]:
                     totalsize += int(filesize[0])
                 else:
@@ -455,8 +475,27 @@ def jdlink(uripath, opt={}, **kwargs):
                 )
             )
         alloutput = [[] for _ in range(3)]
-        for i in range(len(uripath)):
-            newdata, fname, cachepath = downloadlink(uripath[i], opt, **kwargs)
+        uniquepath = list(dict.fromkeys(uripath))  # repeated links are loaded once
+        nthread = min(opt.get("downloadthread", 1), len(uniquepath))
+        loadopt = {k: v for k, v in opt.items() if k != "downloadthread"}
+        if nthread > 1:
+            # each download gets its own copy of opt as the loaders modify it
+            with ThreadPoolExecutor(max_workers=nthread) as pool:
+                results = list(
+                    pool.map(
+                        lambda uri: downloadlink(uri, dict(loadopt), **kwargs),
+                        uniquepath,
+                    )
+                )
+        else:
+            results = [downloadlink(uri, loadopt, **kwargs) for uri in uniquepath]
+        results = dict(zip(uniquepath, results))
+        loaded = set()
+        for uri in uripath:
+            newdata, fname, cachepath = results[uri]
+            if uri in loaded:
+                newdata = copy.deepcopy(newdata)  # repeated links are not aliased
+            loaded.add(uri)
             alloutput[0].append(newdata)
             alloutput[1].append(fname)
             alloutput[2].append(cachepath)
@@ -468,17 +507,126 @@ def jdlink(uripath, opt={}, **kwargs):
     return newdata, fname
 
 
+def _httpget(url, fid=None):
+    """Download the content of a URL
+
+    If the optional urllib3 module is installed, http/https connections are taken from
+    a shared pool, so that repeated downloads from the same server skip the TCP/TLS
+    handshake; otherwise, or for other schemes such as ftp://, urllib.request is used.
+    Compressed (gzip or deflate) responses are decompressed on the fly. The content is
+    returned as bytes, or, if a writable binary file object fid is given, written to
+    fid chunk by chunk without buffering it all
+    """
+
+    pool = _httppool(url)
+    if pool is None:
+        req = urllib.request.Request(url, headers=_httpheaders)
+        with urllib.request.urlopen(req) as resp:
+            encoding = resp.headers.get("Content-Encoding", "").lower()
+            chunks = iter(lambda: resp.read(_httpchunk), b"")
+            return _httpcopy(_httpdecode(chunks, encoding), fid)
+
+    import urllib3
+
+    try:
+        resp = pool.request("GET", url, headers=_httpheaders, preload_content=False)
+        try:
+            if resp.status >= 400:
+                raise urllib.error.HTTPError(
+                    url, resp.status, resp.reason, resp.headers, None
+                )
+            return _httpcopy(resp.stream(_httpchunk), fid)
+        finally:
+            resp.release_conn()
+    except urllib3.exceptions.HTTPError as e:
+        # report network failures as urllib.error.URLError, same as urllib.request
+        raise urllib.error.URLError(getattr(e, "reason", None) or e) from e
+
+
+def _httppool(url):
+    """Return the shared urllib3 connection pool to download an http/https URL
+
+    The proxy settings (http_proxy, https_proxy, no_proxy) are taken from the
+    environment as urllib.request does, and are resolved once for each scheme and host.
+    Returns None if urllib3 is not installed or the URL (or its proxy) uses a scheme
+    that urllib3 does not handle
+    """
+
+    try:
+        import urllib3
+    except ImportError:
+        return None
+
+    link = urllib.parse.urlsplit(url)
+    scheme = link.scheme.lower()
+    if scheme not in ("http", "https"):
+        return None
+
+    route = (scheme, link.hostname)
+    if route not in _httproutes:
+        proxy = urllib.request.getproxies().get(scheme)
+        if proxy and link.hostname and urllib.request.proxy_bypass(link.hostname):
+            proxy = None
+        _httproutes[route] = proxy
+
+    proxy = _httproutes[route]
+    if proxy and not proxy.lower().startswith(("http://", "https://")):
+        return None
+
+    if proxy not in _httppools:
+        _httppools[proxy] = (
+            urllib3.ProxyManager(proxy) if proxy else urllib3.PoolManager()
+        )
+    return _httppools[proxy]
+
+
+def _httpdecode(chunks, encoding):
+    """Decompress a stream of gzip or deflate encoded byte chunks"""
+
+    if encoding not in ("gzip", "deflate"):
+        yield from chunks
+        return
+
+    unzipper = zlib.decompressobj(zlib.MAX_WBITS | 16) if encoding == "gzip" else None
+    head = b""
+    for chunk in chunks:
+        if unzipper is None:
+            # deflate content may be sent with or without the zlib header, which is
+            # detected from the first two bytes, possibly spread over several chunks
+            head += chunk
+            if len(head) < 2:
+                continue
+            iszlib = (head[0] & 0x0F) == 8 and int.from_bytes(head[:2], "big") % 31 == 0
+            unzipper = zlib.decompressobj(zlib.MAX_WBITS if iszlib else -zlib.MAX_WBITS)
+            chunk = head
+        yield unzipper.decompress(chunk)
+    if unzipper is None and head:
+        unzipper = zlib.decompressobj(-zlib.MAX_WBITS)
+        yield unzipper.decompress(head)
+    if unzipper is not None:
+        yield unzipper.flush()
+
+
+def _httpcopy(chunks, fid=None):
+    """Join the downloaded chunks to bytes, or write them to fid if given"""
+
+    if fid is None:
+        return b"".join(chunks)
+    for chunk in chunks:
+        fid.write(chunk)
+
+
 def downloadlink(uripath, opt={}, **kwargs):
     opt.setdefault("showlink", 1)
 
-    if "nocache" in opt and opt["nocache"]:
-        newdata = urllib.request.urlopen(uripath).read()
+    if opt.get("nocache"):
+        newdata = _httpget(uripath)
         try:
             newdata = loadts(newdata, opt, **kwargs)
-        except:
+        except Exception:
             try:
                 newdata = loadbs(newdata, opt, **kwargs)
-            except:
+            except Exception:
                 pass
         return newdata, uripath, None
 
@@ -489,12 +637,20 @@ def downloadlink(uripath, opt={}, **kwargs):
             print("downloading from URL:", uripath)
         fname = os.path.join(cachepath[0], filename)
         fpath = os.path.dirname(fname)
-        if not os.path.exists(fpath):
-            os.makedirs(fpath)
+        os.makedirs(fpath, exist_ok=True)
 
-        rawdata = urllib.request.urlopen(uripath).read()
-        with open(fname, "wb") as fid:
-            fid.write(rawdata)
+        # download to a uniquely named temporary file first, so that a failed transfer
+        # does not leave a truncated file in the cache, and concurrent downloads of
+        # links mapped to the same cache file do not write to the same file
+        tmpname = "{}.{}.download".format(fname, uuid.uuid4().hex)
+        try:
+            with open(tmpname, "wb") as fid:
+                _httpget(uripath, fid)
+            os.replace(tmpname, fname)
+        except BaseException:
+            if os.path.exists(tmpname):
+                os.remove(tmpname)
+            raise
         spl = os.path.splitext(fname)
         ext = spl[1].lower()
         if ext in jext["t"] or ext in jext["b"]:
@@ -16,21 +16,36 @@ __all__ = [
 import re
 import json
 import copy
+import functools
+
+##====================================================================================
+## global variables
+##====================================================================================
+
+_quotes = "'\""
+_rangechars = "-0123456789:*"
+
+_re_deepscan = re.compile(r"^\.\.")
+_re_leadingdots = re.compile(r"^\.+")
+_re_dollaridx = re.compile(r"\$\d+")
+_re_arrayidx = re.compile(r"^\[[\-0-9\*:]+\]$")
+_re_slice = re.compile(r"(?P<start>-*\d*):(?P<end>-*\d*)")
+_re_intidx = re.compile(r"^[-0-9:]+$")
+_re_wildcard = re.compile(r"^\*$")
+_re_bracketed = re.compile(r"^\[(.*)\]$")
+
+# kinds of _Level results
+_levelvalue = 0
+_levellist = 1
+_leveldict = 2
 
 
 def jsonpath(root, jpath, opt={}):
 
+    opt.setdefault("inplace", False)
+
     obj = root
-    jpath = re.sub(r"([^.\]])(\[[-0-9:\*]+\])", r"\1.\2", jpath)
-    jpath = re.sub(r"\[[\'\"]*([^]\'\"]+)[\'\"]*\]", r".[\1]", jpath)
-    jpath = re.sub(r"\\.", "_0x2E_", jpath)
-    while re.search(r"(\[[\'\"]*[^]\'\"]+)\.(?=[^]\'\"]+[\'\"]*\])", jpath):
-        jpath = re.sub(
-            r"(\[[\'\"]*[^]\'\"]+)\.(?=[^]\'\"]+[\'\"]*\])", r"\1_0x2E_", jpath
-        )
-
-    paths = re.findall(r"(\.{0,2}[^.]+)", jpath)
-    paths = [re.sub("_0x2E_", ".", x) for x in paths]
+    paths = list(_tokenize(jpath))
     if paths and paths[0] == "$":
         paths.pop(0)
 
@@ -38,136 +53,245 @@ def jsonpath(root, jpath, opt={}):
         obj, isfound = getonelevel(obj, paths, i, opt)
         if not isfound:
             return None
-    return obj
+    return copy.deepcopy(obj) if opt["inplace"] else obj
 
 
-def getonelevel(input_data, paths, pathid, opt):
+@functools.lru_cache(maxsize=256)
+def _tokenize(jpath):
+    """Split a JSONPath string into per-level segments in a single pass
 
-    opt.setdefault("inplace", False)
+    Each returned segment keeps its leading "." or ".." (deep-scan) prefix, bracketed
+    keys are normalized to "[key]" with quotes removed, and dots inside brackets or
+    escaped as "\\." are kept as part of the key name. Results are cached, as the same
+    path is often queried repeatedly, and returned as a tuple so they can not be altered.
+    """
+
+    paths = []
+    seg = []
+    ndot = 0
+    i = 0
+    n = len(jpath)
+
+    while i < n:
+        c = jpath[i]
+        if c == "\\" and i + 1 < n:
+            seg.append(jpath[i + 1])
+            i += 2
+            continue
+        if c == ".":
+            if seg:
+                paths.append("." * min(ndot, 2) + "".join(seg))
+                seg = []
+                ndot = 0
+            ndot += 1
+            i += 1
+            continue
+        if c == "[":
+            start = i + 1
+            while start < n and jpath[start] in _quotes:
+                start += 1
+            end = start
+            while end < n and jpath[end] not in "]" + _quotes:
+                end += 1
+            close = end
+            while close < n and jpath[close] in _quotes:
+                close += 1
+            if end > start and close < n and jpath[close] == "]":
+                key = jpath[start:end]
+                # an index/slice glued to a name, such as a[1], scans recursively
+                isindex = (
+                    i > 0
+                    and jpath[i - 1] not in ".]"
+                    and start == i + 1
+                    and close == end
+                    and all(x in _rangechars for x in key)
+                )
+                if seg:
+                    paths.append("." * min(ndot, 2) + "".join(seg))
+                    seg = []
+                    ndot = 0
+                ndot += 2 if isindex else 1
+                seg.append("[" + key.replace("\\", "") + "]")
+                i = close + 1
+                continue
+        seg.append(c)
+        i += 1
+
+    if seg:
+        paths.append("." * min(ndot, 2) + "".join(seg))
+    return tuple(paths)
+
+
+def getonelevel(input_data, paths, pathid, opt):
 
     pathname = paths[pathid]
-    if isinstance(pathname, list):
-        pathname = pathname[0]
-    deepscan = bool(re.search(r"^\.\.", pathname))
+    deepscan = bool(_re_deepscan.search(pathname))
     origpath = pathname
-    pathname = re.sub(r"^\.+", "", pathname)
+    pathname = _re_leadingdots.sub("", pathname)
     obj = None
     isfound = False
 
-    if pathname == "$":
-        obj = input_data
-    elif re.match(r"\$\d+", pathname):
-        obj = input_data[int(pathname[2:]) + 1]
-    elif re.match(r"^\[[\-0-9\*:]+\]$", pathname) or isinstance(
-        input_data, (list, tuple, frozenset)
-    ):
-        arraystr = pathname[1:-1]
-        arrayrange = {"start": None, "end": None}
-
-        if ":" in arraystr:
-            match = re.search(r"(?P<start>-*\d*):(?P<end>-*\d*)", arraystr)
-            if match:
-                arrayrange["start"] = (
-                    int(match.group("start")) if match.group("start") else None
-                )
-                arrayrange["end"] = (
-                    int(match.group("end")) if match.group("end") else None
-                )
-
-                if arrayrange["start"] is not None:
-                    if arrayrange["start"] < 0:
-                        arrayrange["start"] = len(input_data) + arrayrange["start"] + 1
-                    else:
-                        arrayrange["start"] += 1
-                else:
-                    arrayrange["start"] = 1
-
-                if arrayrange["end"] is not None:
-                    if arrayrange["end"] < 0:
-                        arrayrange["end"] = len(input_data) + arrayrange["end"] + 1
-                    else:
-                        arrayrange["end"] += 1
-                else:
-                    arrayrange["end"] = len(input_data)
-        elif re.match(r"^[-0-9:]+$", arraystr):
-            firstidx = int(arraystr)
-            if firstidx < 0:
-                firstidx = len(input_data) + firstidx + 1
-            else:
-                firstidx += 1
-            arrayrange["start"] = arrayrange["end"] = firstidx
-        elif re.match(r"^\*$", arraystr):
-            arrayrange = {"start": 1, "end": len(input_data)}
-
-        if (
-            "arrayrange" in locals()
-            and arrayrange["start"] is not None
-            and arrayrange["end"] is not None
-        ):
-            obj = input_data[arrayrange["start"] - 1 : arrayrange["end"]]
-        else:
-            arrayrange = {"start": 1, "end": len(input_data)}
-
-        if not obj and isinstance(input_data, list):
-            input_data = input_data[arrayrange["start"] - 1 : arrayrange["end"]]
-            searchkey = ".." + pathname if deepscan else origpath
-            newobj = []
-            for idx, item in enumerate(input_data):
+    if deepscan:
+        obj = _deepscan(input_data, pathname)
+    else:
+        level = _matchlevel(input_data, pathname)
+        obj = level.obj
+        if level.kind == _levellist:
+            for item in level.children:
                 val, isfound = getonelevel(
-                    item, paths[:pathid] + [searchkey], pathid, opt
+                    item, paths[:pathid] + [origpath], pathid, opt
                 )
                 if isfound:
-                    if isinstance(val, list):
-                        if len(val) > 1:
-                            newobj.extend(val)
-                        else:
-                            newobj.append(val)
-                    else:
-                        newobj.append(val)
-            if newobj:
-                obj = newobj
+                    _appendfound(level.newobj, val)
+            if level.newobj:
+                obj = level.newobj
             if isinstance(obj, list) and len(obj) == 1:
                 obj = obj[0]
+        elif level.kind == _leveldict:
+            obj = obj[0] if obj is not None else _deepscan(input_data, pathname)
+        elif level.kind is None:
+            raise ValueError(
+                f'json path segment "{pathname}" can not be found in the input_data object'
+            )
 
-    elif isinstance(input_data, dict):
-        pathname = re.sub(r"^\[(.*)\]$", r"\1", pathname)
-        stpath = pathname
+    if obj is None:
+        isfound = False
+        obj = []
+    else:
+        isfound = True
 
-        if stpath in input_data:
-            obj = [input_data[stpath]]
+    return obj, isfound
 
-        if obj is None or deepscan:
-            items = input_data.keys()
 
-            for idx in items:
-                val, isfound = getonelevel(
-                    input_data[idx], paths[:pathid] + [[".." + pathname]], pathid, opt
-                )
-                if isfound:
-                    obj = obj or []
-                    if isinstance(val, list):
-                        if len(val) > 1:
-                            obj.extend(val)
-                        else:
-                            obj.append(val)
-                    else:
-                        obj.append(val)
+class _Level:
+    """Result of matching one path segment at one node, see _matchlevel()
 
-            if obj and len(obj) == 1:
-                obj = obj[0]
+    kind is _levelvalue if obj is the final value; _levellist if the segment must be
+    applied to each item in children, with the results collected in newobj; _leveldict
+    if obj is [value] (or None if the key is absent) and the key, childpath, is also
+    searched in children by a deep scan; None if the node can not be indexed
+    """
 
-        if isinstance(obj, list) and len(obj) == 1:
-            obj = obj[0]
+    __slots__ = ("kind", "obj", "children", "childpath", "newobj")
 
-    elif not deepscan:
-        raise ValueError(
-            f'json path segment "{pathname}" can not be found in the input_data object'
-        )
+    def __init__(self, kind, obj=None, children=(), childpath=None):
+        self.kind = kind
+        self.obj = obj
+        self.children = iter(children)
+        self.childpath = childpath
+        self.newobj = [] if kind == _levellist else None
 
-    if obj is None:
-        isfound = False
-        obj = []
+
+def _matchlevel(input_data, pathname):
+    """Match a path segment, without its leading dots, against one node of the data"""
+
+    if pathname == "$":
+        return _Level(_levelvalue, input_data)
+    elif pathname.startswith("$") and _re_dollaridx.match(pathname):
+        return _Level(_levelvalue, input_data[int(pathname[2:]) + 1])
+    elif isinstance(input_data, (list, tuple, frozenset)) or (
+        pathname.startswith("[") and _re_arrayidx.match(pathname)
+    ):
+        obj = None
+        arrayrange = _arrayrange(pathname[1:-1], len(input_data))
+        if arrayrange:
+            obj = input_data[arrayrange[0] - 1 : arrayrange[1]]
+        else:
+            arrayrange = (1, len(input_data))
+
+        if not obj and isinstance(input_data, list):
+            children = input_data[arrayrange[0] - 1 : arrayrange[1]]
+            return _Level(_levellist, obj, children, pathname)
+        return _Level(_levelvalue, obj)
+    elif isinstance(input_data, dict):
+        key = _re_bracketed.sub(r"\1", pathname)
+        obj = [input_data[key]] if key in input_data else None
+        return _Level(_leveldict, obj, input_data.values(), key)
+    return _Level(None)
+
+
+def _appendfound(newobj, val):
+    """Add a value found in a child node to the results of its parent"""
+
+    if isinstance(val, list) and len(val) > 1:
+        newobj.extend(val)
     else:
-        isfound = True
+        newobj.append(val)
+
+
+def _arrayrange(arraystr, length):
+    """Convert an index or slice string, such as "1", "-2:", "*", to 1-based (start, end)
+
+    Returns None if arraystr is not an array index.
+    """
 
-    return (copy.deepcopy(obj), isfound) if opt["inplace"] else (obj, isfound)
+    if ":" in arraystr:
+        match = _re_slice.search(arraystr)
+        if match:
+            start = int(match.group("start")) if match.group("start") else None
+            end = int(match.group("end")) if match.group("end") else None
+
+            if start is None:
+                start = 1
+            elif start < 0:
+                start = length + start + 1
+            else:
+                start += 1
+
+            if end is None:
+                end = length
+            elif end < 0:
+                end = length + end + 1
+            else:
+                end += 1
+            return start, end
+    elif _re_intidx.match(arraystr):
+        idx = int(arraystr)
+        idx = length + idx + 1 if idx < 0 else idx + 1
+        return idx, idx
+    elif _re_wildcard.match(arraystr):
+        return 1, length
+    return None
+
+
+def _deepscan(input_data, pathname):
+    """Search pathname recursively in all nested dict/list nodes of input_data
+
+    Gives the same result as recursively calling getonelevel() with "..pathname" on
+    every child, but walks the tree with an explicit stack of _Level objects, avoiding
+    the per-node call overhead and the recursion limit on deeply nested data.
+    """
+
+    stack = [_matchlevel(input_data, pathname)]
+    while True:
+        level = stack[-1]
+        child = next(level.children, level)
+        if child is not level:
+            stack.append(_matchlevel(child, level.childpath))
+            continue
+
+        stack.pop()
+        obj = level.obj
+        if level.kind == _levellist:
+            if level.newobj:
+                obj = level.newobj
+            if isinstance(obj, list) and len(obj) == 1:
+                obj = obj[0]
+        elif level.kind == _leveldict:
+            if obj and len(obj) == 1:
+                obj = obj[0]
+            if isinstance(obj, list) and len(obj) == 1:
+                obj = obj[0]
+
+        if not stack:
+            return obj
+        if obj is None:
+            continue
+
+        parent = stack[-1]
+        if parent.kind == _leveldict:
+            if parent.obj is None:
+                parent.obj = []
+            _appendfound(parent.obj, obj)
+        else:
+            _appendfound(parent.newobj, obj)
@@ -17,8 +17,13 @@ Copyright (c) 2019-2024 Qianqian Fang <q.fang at neu.edu>
 import unittest
 
 from jdata import *
+from jdata.jfile import _httpdecode
 import numpy as np
+import os
 import re
+import tempfile
+import gzip
+import zlib
 import warnings
 from collections import OrderedDict
 
@@ -136,6 +141,19 @@ class TestModule(unittest.TestCase):
             {"compact": 1, "compression": "lzma", "compressarraysize": 0},
         )
 
+        test_jdata(
+            "byte string array data",
+            debug_print,
+            decode(
+                {
+                    "_ArrayType_": "uint8",
+                    "_ArraySize_": [2],
+                    "_ArrayData_": "\x01\xff",
+                }
+            ),
+            '{"_ArrayType_":"uint8","_ArraySize_":[2],"_ArrayData_":[1,255]}',
+        )
+
     def test_jsonpath(self):
         print("\n")
         print("".join(["=" for _ in range(79)]))
@@ -321,6 +339,12 @@ class TestModule(unittest.TestCase):
             jsonpath(testdata, "$.[game.arcade]"),
             '{"title":"Mario"}',
         )
+        test_jdata(
+            "jsonpath dot at the end of [] key name",
+            debug_print,
+            jsonpath({"a.": 1, "a": {"": 2}}, '$["a."]'),
+            "1",
+        )
         test_jdata(
             "jsonpath scan struct array",
             debug_print,
@@ -328,6 +352,99 @@ class TestModule(unittest.TestCase):
             "null",
         )
 
+        nested = {}
+        node = nested
+        for i in range(2000):
+            node["child"] = {}
+            node = node["child"]
+        node["title"] = "leaf"
+        test_jdata(
+            "jsonpath deep scan of deeply nested object",
+            debug_print,
+            jsonpath(nested, "$..title"),
+            '"leaf"',
+        )
+
+    def test_jfile(self):
+        print("\n")
+        print("".join(["=" for _ in range(79)]))
+        print("Test file and URL helpers")
+        print("".join(["=" for _ in range(79)]))
+
+        def decodechunks(payload, encoding, firstchunk=7):
+            chunks = [payload[:firstchunk]] + [
+                payload[i : i + 7] for i in range(firstchunk, len(payload), 7)
+            ]
+            return b"".join(_httpdecode(iter(chunks), encoding)).decode("utf-8")
+
+        rawdeflate = zlib.compressobj(wbits=-zlib.MAX_WBITS)
+        text = '{"a":[1,2,3],"b":"hello"}' * 4
+        data = text.encode("utf-8")
+
+        test_jdata("http gzip", decodechunks, gzip.compress(data), text, "gzip")
+        test_jdata(
+            "http gzip 1-byte first chunk",
+            decodechunks,
+            gzip.compress(data),
+            text,
+            "gzip",
+            1,
+        )
+        test_jdata(
+            "http zlib deflate", decodechunks, zlib.compress(data), text, "deflate"
+        )
+        test_jdata(
+            "http zlib deflate 1-byte first chunk",
+            decodechunks,
+            zlib.compress(data),
+            text,
+            "deflate",
+            1,
+        )
+        test_jdata(
+            "http raw deflate 1-byte first chunk",
+            decodechunks,
+            rawdeflate.compress(data) + rawdeflate.flush(),
+            text,
+            "deflate",
+            1,
+        )
+        test_jdata("http plain", decodechunks, data, text, "")
+        test_jdata("http identity", decodechunks, data, text, "identity", 1)
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            links = []
+            for i in range(2):
+                links.append(os.path.join(tmpdir, "link{}.json".format(i)))
+                with open(links[-1], "w") as fid:
+                    fid.write('{"id":' + str(i) + "}")
+            links = [links[0], links[1], links[0]]
+
+            for mode, linkopt in (
+                ("serial", {"showlink": 0}),
+                ("parallel", {"showlink": 0, "downloadthread": 2}),
+            ):
+                linkdata, linkfiles = jdlink(links, linkopt)
+
+                test_jdata(
+                    "jdlink " + mode + " list with repeated links",
+                    debug_print,
+                    linkdata,
+                    '[{"id":0},{"id":1},{"id":0}]',
+                )
+                test_jdata(
+                    "jdlink " + mode + " list file names",
+                    lambda x: x == links,
+                    linkfiles,
+                    "True",
+                )
+                test_jdata(
+                    "jdlink " + mode + " repeated links are not aliased",
+                    lambda x: x[0] == x[2] and x[0] is not x[2],
+                    linkdata,
+                    "True",
+                )
+
 
 if __name__ == "__main__":
     unittest.main()